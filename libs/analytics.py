@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_equity_matrix(equity_curves) -> np.ndarray:
+    """
+    Stacks equity curves into a (runs x bars) float matrix.
+    Curves shorter than the longest one are padded with NaN at the end.
+    """
+    if hasattr(equity_curves, 'ndim'):
+        # ndarray / DataFrame / Series: iterating a DataFrame would yield column labels
+        eq = np.asarray(equity_curves, dtype=float)
+        return eq.reshape(1, -1) if eq.ndim == 1 else eq
+
+    curves = [np.asarray(c, dtype=float) for c in equity_curves]
+    n_bars = max((len(c) for c in curves), default=0)
+    eq = np.full((len(curves), n_bars), np.nan)
+    for i, c in enumerate(curves):
+        eq[i, :len(c)] = c
+    return eq
+
+
+def _flatten_trades(trade_pnls, n_runs: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Flattens ragged per-run trade PnLs into one array plus per-run trade counts.
+    """
+    if trade_pnls is None:
+        return np.empty(0), np.zeros(n_runs, dtype=np.int64)
+    if len(trade_pnls) != n_runs:
+        raise ValueError(f"Got {len(trade_pnls)} trade arrays for {n_runs} equity curves.")
+
+    arrays = [np.asarray(p, dtype=float).ravel() for p in trade_pnls]
+    lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+    flat = np.concatenate(arrays) if arrays else np.empty(0)
+    return flat, lengths
+
+
+def _bar_returns(eq: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.diff(eq, axis=1) / eq[:, :-1]
+
+
+def _ragged_from_matrix(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts a NaN-padded matrix into (flat values, per-row lengths).
+    """
+    mask = np.isfinite(values)
+    return values[mask], mask.sum(axis=1).astype(np.int64)
+
+
+def compute_performance_metrics(equity_curves, trade_pnls=None, periods_per_year: int = 252) -> pd.DataFrame:
+    """
+    Computes performance metrics for many backtest runs at once.
+    Args:
+        equity_curves: 2-D array (runs x bars) of portfolio values, or a list of
+            per-run curves (shorter ones are NaN padded).
+        trade_pnls: list with one array of closed-trade PnLs per run (may be ragged).
+        periods_per_year: bars per year used to annualize the Sharpe ratio.
+    Returns:
+        Dataframe with one row per run: TotalTrades, WinRate (%), AvgWin, AvgLoss,
+        PLRatio, Expectancy, MaxDrawdown (%) and Sharpe.
+    """
+    eq = _as_equity_matrix(equity_curves)
+    n_runs = eq.shape[0]
+
+    # --- Trade statistics (ragged -> bincount reductions) ---
+    flat, lengths = _flatten_trades(trade_pnls, n_runs)
+    run_ids = np.repeat(np.arange(n_runs), lengths)
+    is_win = flat > 0
+
+    n_wins = np.bincount(run_ids, weights=is_win, minlength=n_runs)
+    n_losses = lengths - n_wins
+    win_sum = np.bincount(run_ids, weights=np.where(is_win, flat, 0.0), minlength=n_runs)
+    loss_sum = np.bincount(run_ids, weights=np.where(is_win, 0.0, -flat), minlength=n_runs)
+    pnl_sum = np.bincount(run_ids, weights=flat, minlength=n_runs)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_win = np.where(n_wins > 0, win_sum / n_wins, 0.0)
+        avg_loss = np.where(n_losses > 0, loss_sum / n_losses, 0.0)
+        pl_ratio = np.where(avg_loss > 0, avg_win / avg_loss, np.inf)
+        win_rate = np.where(lengths > 0, n_wins / lengths * 100, np.nan)
+        expectancy = np.where(lengths > 0, pnl_sum / lengths, np.nan)
+
+    # --- Max drawdown ---
+    if eq.shape[1] > 1:
+        cummax = np.fmax.accumulate(eq, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dd = (cummax - eq) / cummax
+        dd[~np.isfinite(dd)] = 0.0
+        max_dd = dd.max(axis=1) * 100
+    else:
+        max_dd = np.zeros(n_runs)
+
+    # --- Sharpe ratio ---
+    returns = _bar_returns(eq)
+    valid = np.isfinite(returns)
+    n_ret = valid.sum(axis=1)
+    r = np.where(valid, returns, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = r.sum(axis=1) / n_ret
+        std = np.sqrt(np.where(valid, (r - mean[:, None]) ** 2, 0.0).sum(axis=1) / n_ret)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+
+    return pd.DataFrame({
+        'TotalTrades': lengths,
+        'WinRate': win_rate,
+        'AvgWin': avg_win,
+        'AvgLoss': avg_loss,
+        'PLRatio': pl_ratio,
+        'Expectancy': expectancy,
+        'MaxDrawdown': max_dd,
+        'Sharpe': sharpe,
+    })
+
+
+def _bootstrap_moments(flat: np.ndarray, lengths: np.ndarray, n_boot: int,
+                       rng: np.random.Generator, max_cells: int) -> tuple[np.ndarray, ...]:
+    """
+    Resamples every run with replacement and returns, per (run, sample), the mean of
+    the values, the mean of their squares and the fraction of positive values.
+    All samples of a block of runs are drawn as one array; blocks are sized so a block
+    holds at most `max_cells` draws.
+    """
+    n_runs = len(lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    m1 = np.full((n_runs, n_boot), np.nan)
+    m2 = np.full((n_runs, n_boot), np.nan)
+    pos = np.full((n_runs, n_boot), np.nan)
+    if flat.size == 0:
+        return m1, m2, pos
+
+    order = np.argsort(lengths, kind='stable')  # group similar lengths to limit padding
+    sorted_lengths = np.maximum(lengths[order], 1)
+    start = 0
+    while start < n_runs:
+        cost = np.arange(1, n_runs - start + 1) * n_boot * sorted_lengths[start:]
+        block = max(1, int(np.searchsorted(cost, max_cells, side='right')))
+        rows = order[start:start + block]
+        max_len = int(sorted_lengths[start:start + block].max())
+
+        n = lengths[rows][:, None, None]
+        u = rng.random((len(rows), n_boot, max_len))
+        idx = offsets[rows][:, None, None] + (u * n).astype(np.int64)
+        mask = np.arange(max_len) < n
+        sample = np.where(mask, flat[np.minimum(idx, flat.size - 1)], 0.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m1[rows] = sample.sum(axis=2) / n[:, :, 0]
+            m2[rows] = (sample ** 2).sum(axis=2) / n[:, :, 0]
+            pos[rows] = (sample > 0).sum(axis=2) / n[:, :, 0]
+        start += len(rows)
+    return m1, m2, pos
+
+
+def bootstrap_confidence_intervals(equity_curves, trade_pnls=None, n_boot: int = 1000,
+                                   ci: float = 0.95, periods_per_year: int = 252,
+                                   seed: int | None = None, max_cells: int = 5_000_000) -> pd.DataFrame:
+    """
+    Bootstrap confidence intervals for Sharpe, expectancy and win rate of many runs.
+    Bar returns and trade PnLs are resampled with replacement; all bootstrap samples
+    are drawn and reduced as arrays instead of looping per sample.
+    Args:
+        equity_curves: 2-D array (runs x bars) or list of equity curves.
+        trade_pnls: list with one array of closed-trade PnLs per run.
+        n_boot: number of bootstrap samples per run.
+        ci: confidence level of the interval, e.g. 0.95.
+        periods_per_year: bars per year used to annualize the Sharpe ratio.
+        seed: seed for the random generator.
+        max_cells: upper bound on the number of draws held in memory at once.
+    Returns:
+        Dataframe with one row per run and <Metric>_Low / <Metric>_High columns.
+    """
+    rng = np.random.default_rng(seed)
+    eq = _as_equity_matrix(equity_curves)
+    n_runs = eq.shape[0]
+    q = [(1 - ci) / 2, 1 - (1 - ci) / 2]
+
+    ret_flat, ret_lengths = _ragged_from_matrix(_bar_returns(eq))
+    r1, r2, _ = _bootstrap_moments(ret_flat, ret_lengths, n_boot, rng, max_cells)
+    std = np.sqrt(np.maximum(r2 - r1 ** 2, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, r1 / std * np.sqrt(periods_per_year), 0.0)
+    sharpe[np.isnan(r1)] = np.nan
+
+    trade_flat, trade_lengths = _flatten_trades(trade_pnls, n_runs)
+    t1, _, t_pos = _bootstrap_moments(trade_flat, trade_lengths, n_boot, rng, max_cells)
+
+    out = {}
+    for name, samples in (('Sharpe', sharpe), ('Expectancy', t1), ('WinRate', t_pos * 100)):
+        has_data = ~np.isnan(samples).all(axis=1)
+        bounds = np.full((2, n_runs), np.nan)
+        if has_data.any():
+            bounds[:, has_data] = np.quantile(samples[has_data], q, axis=1)
+        out[f'{name}_Low'] = bounds[0]
+        out[f'{name}_High'] = bounds[1]
+    return pd.DataFrame(out)
+
+
+def summarize_runs(equity_curves, trade_pnls=None, n_boot: int = 0, ci: float = 0.95,
+                   periods_per_year: int = 252, seed: int | None = None) -> pd.DataFrame:
+    """
+    Metrics for every run, optionally joined with bootstrap confidence intervals.
+    Args:
+        equity_curves: 2-D array (runs x bars) or list of equity curves.
+        trade_pnls: list with one array of closed-trade PnLs per run.
+        n_boot: number of bootstrap samples; 0 skips the confidence intervals.
+        ci: confidence level of the interval.
+        periods_per_year: bars per year used to annualize the Sharpe ratio.
+        seed: seed for the bootstrap random generator.
+    Returns:
+        Dataframe indexed by run number.
+    """
+    metrics_df = compute_performance_metrics(equity_curves, trade_pnls, periods_per_year)
+    if n_boot > 0:
+        ci_df = bootstrap_confidence_intervals(equity_curves, trade_pnls, n_boot=n_boot, ci=ci,
+                                               periods_per_year=periods_per_year, seed=seed)
+        metrics_df = pd.concat([metrics_df, ci_df], axis=1)
+    metrics_df.index.name = 'Run'
+    return metrics_df
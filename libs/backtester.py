@@ -3,6 +3,7 @@ import backtrader as bt
 import pandas as pd
 from libs.data_loader import get_stock_data
 from libs.bull_detector import detect_and_label_bull_runs
+from libs.analytics import compute_performance_metrics
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -78,7 +79,7 @@ class SMACrossBullStrategy(bt.Strategy):
             avg_win = sum(self.wins) / len(self.wins)
             avg_loss = sum(self.losses) / len(self.losses)
             pl_ratio = avg_win / avg_loss if avg_loss != 0 else float('inf')
-            report_performance(self.wins, self.losses, self.trade_pnls, self.equity_curve)
+            report_performance(self.trade_pnls, self.equity_curve)
             print(f"Avg Win: {avg_win:.2f}, Avg Loss: {avg_loss:.2f}, Profit/Loss Ratio: {pl_ratio:.2f}")
         else:
             print("No completed trades to calculate profit/loss ratio.")
@@ -91,35 +92,15 @@ def plot_equity_curve(equity_curve):
     plt.ylabel("Portfolio Value")
     plt.show()
 
-def report_performance(wins, losses, trade_pnls, equity_curve):
+def report_performance(trade_pnls, equity_curve):
     total_trades = len(trade_pnls)
     if total_trades == 0:
         print("No trades were closed.")
         return
 
-    # Avg Win/Loss
-    avg_win = np.mean(wins) if wins else 0
-    avg_loss = np.mean(losses) if losses else 0
-    pl_ratio = avg_win / avg_loss if avg_loss > 0 else float('inf')
-
-    # Win Rate
-    win_rate = len(wins) / total_trades * 100
-
-    # Expectancy
-    expectancy = np.mean(trade_pnls)
-
-    # Max Drawdown
-    eq = np.array(equity_curve)
-    if len(eq) > 1:
-        cummax = np.maximum.accumulate(eq)
-        dd = (cummax - eq) / cummax
-        max_dd = dd.max() * 100
-    else:
-        max_dd = 0
-
-    # Sharpe Ratio (daily)
-    returns = np.diff(eq) / eq[:-1]
-    sharpe = (np.mean(returns) / np.std(returns) * np.sqrt(252)) if np.std(returns) > 0 else 0
+    m = compute_performance_metrics([equity_curve], [trade_pnls]).iloc[0]
+    win_rate, avg_win, avg_loss, pl_ratio = m['WinRate'], m['AvgWin'], m['AvgLoss'], m['PLRatio']
+    expectancy, max_dd, sharpe = m['Expectancy'], m['MaxDrawdown'], m['Sharpe']
 
     # Print Report
     print(f"Total Trades: {total_trades}")
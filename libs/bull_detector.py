@@ -1,9 +1,24 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 
 
+def rolling_slope(series: np.ndarray, window: int) -> np.ndarray:
+    """
+    Least-squares slope of the `window` values before each bar (bar i uses series[i-window:i]),
+    NaN for the first `window` bars. Every window is fitted independently, so a chunk
+    prefixed with the previous `window` values gives exactly the same slopes.
+    """
+    n = len(series)
+    slope_arr = np.full(n, np.nan)
+    if n <= window:
+        return slope_arr
+    x = np.arange(window) - (window - 1) / 2
+    windows = np.lib.stride_tricks.sliding_window_view(np.asarray(series, dtype=float), window)[:-1]
+    slope_arr[window:] = (windows * x).sum(axis=1) / (x @ x)
+    return slope_arr
+
+
 def detect_and_label_bull_runs(df, tickers, trend_window=20, slope_threshold_ppd=0.001,
                                min_bull_duration_days=3, use_log=True):
     df = df.copy()
@@ -21,18 +36,8 @@ def detect_and_label_bull_runs(df, tickers, trend_window=20, slope_threshold_ppd
         series = np.log(prices) if use_log else prices
 
         # Rolling slope on the trailing window
-        slope_arr = np.full(n, np.nan)
-        flag_arr = np.zeros(n, dtype=bool)
-
-        X = np.arange(trend_window).reshape(-1, 1)
-        lr = LinearRegression()
-
-        for i in range(trend_window, n):
-            y = series[i - trend_window:i]
-            lr.fit(X, y)
-            slope = lr.coef_[0]
-            slope_arr[i] = slope
-            flag_arr[i] = (slope >= slope_threshold_ppd)
+        slope_arr = rolling_slope(series, trend_window)
+        flag_arr = slope_arr >= slope_threshold_ppd
 
         # Qualify only runs whose length >= min_bull_duration_days
         qualified_mask = np.zeros(n, dtype=bool)
@@ -69,6 +74,127 @@ def detect_and_label_bull_runs(df, tickers, trend_window=20, slope_threshold_ppd
     return df, runs_df
 
 
+class BullRunStream:
+    """
+    Chunked version of detect_and_label_bull_runs for data that does not fit in memory
+    (e.g. minute bars). Feed time-ordered chunks of the long price dataframe to update();
+    each call returns the bars whose label is settled. Per ticker it carries the last
+    `trend_window` prices, the open run and the bars of a run still shorter than
+    `min_bull_duration_days` (bars, for intraday data) across chunk boundaries, so the
+    concatenated output equals an in-memory run. Call finish() after the last chunk.
+    """
+
+    def __init__(self, trend_window=20, slope_threshold_ppd=0.001, min_bull_duration_days=3, use_log=True):
+        self.trend_window = trend_window
+        self.slope_threshold_ppd = slope_threshold_ppd
+        self.min_bull_duration_days = min_bull_duration_days
+        self.use_log = use_log
+        self.state = {}  # Ticker -> carried state
+        self.runs = []   # qualified runs closed so far
+
+    def _new_state(self):
+        return {'tail': np.empty(0), 'pending': None, 'run_len': 0, 'run_start': None,
+                'run_end': None, 'slopes': []}
+
+    def _close_run(self, ticker, st):
+        """Records the carried (already qualified) run as ended at its last bar."""
+        self.runs.append({
+            'Ticker': ticker,
+            'Start': st['run_start'],
+            'End': st['run_end'],
+            'Length': st['run_len'],
+            'AvgSlope': np.nanmean(np.concatenate(st['slopes']))
+        })
+        st.update(run_len=0, run_start=None, run_end=None, slopes=[])
+
+    def update(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Labels a chunk of bars.
+        Returns:
+            Settled bars with Slope and InBullRun columns (may include bars from earlier chunks).
+        """
+        out = []
+        for ticker, tdf in chunk.sort_values('Date', kind='stable').groupby('Ticker', sort=False):
+            out.append(self._update_ticker(ticker, tdf))
+        return pd.concat(out, ignore_index=True) if out else chunk.iloc[0:0]
+
+    def _update_ticker(self, ticker, tdf: pd.DataFrame) -> pd.DataFrame:
+        st = self.state.setdefault(ticker, self._new_state())
+        prices = tdf['Close'].to_numpy(dtype=float)
+        series = np.log(prices) if self.use_log else prices
+
+        # slopes for the new bars, using the carried trailing prices
+        full = np.concatenate([st['tail'], series])
+        slope_new = rolling_slope(full, self.trend_window)[len(st['tail']):]
+        st['tail'] = full[-self.trend_window:]
+
+        new_rows = tdf.assign(Slope=slope_new, InBullRun=False)
+        work = new_rows if st['pending'] is None else pd.concat([st['pending'], new_rows])
+        st['pending'] = None
+        return self._label(ticker, st, work)
+
+    def _label(self, ticker, st, work: pd.DataFrame, final: bool = False) -> pd.DataFrame:
+        slope = work['Slope'].to_numpy(dtype=float)
+        flags = slope >= self.slope_threshold_ppd
+        labels = np.zeros(len(work), dtype=bool)
+        dates = work['Date'].to_numpy()
+
+        # the carried qualified run ended on the previous chunk's last bar
+        if st['run_len'] and not flags[:1].any():
+            self._close_run(ticker, st)
+
+        padded = np.concatenate([[False], flags, [False]])
+        starts = np.flatnonzero(~padded[:-1] & padded[1:])
+        ends = np.flatnonzero(padded[:-1] & ~padded[1:]) - 1
+        settled = len(work)
+        for start, end in zip(starts, ends):
+            seg = slope[start:end + 1]
+            if start == 0 and st['run_len']:
+                # continuation of the carried run
+                st['run_len'] += end - start + 1
+            else:
+                st.update(run_len=end - start + 1, run_start=dates[start], slopes=[])
+            st['run_end'] = dates[end]
+            st['slopes'].append(seg)
+
+            qualified = st['run_len'] >= self.min_bull_duration_days
+            is_open = end == len(work) - 1 and not final
+            if qualified:
+                labels[start:end + 1] = True
+            if is_open and not qualified:
+                # too short so far: hold these bars back until the run settles
+                settled = start
+                st.update(run_len=0, run_start=None, run_end=None, slopes=[])
+            elif not is_open:
+                if qualified:
+                    self._close_run(ticker, st)
+                else:
+                    st.update(run_len=0, run_start=None, run_end=None, slopes=[])
+
+        if settled < len(work):
+            st['pending'] = work.iloc[settled:]
+        work = work.iloc[:settled].copy()
+        work['InBullRun'] = labels[:settled]
+        return work
+
+    def finish(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Settles the bars still held back at the end of the stream.
+        Returns:
+            (remaining labeled bars, runs summary of all qualified runs, like detect_and_label_bull_runs)
+        """
+        out = []
+        for ticker, st in self.state.items():
+            if st['pending'] is not None:
+                work, st['pending'] = st['pending'], None
+                out.append(self._label(ticker, st, work, final=True))
+            elif st['run_len']:
+                # qualified run still open at the last bar
+                self._close_run(ticker, st)
+        rest = pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+        return rest, pd.DataFrame(self.runs)
+
+
 def summarize_bull_durations(runs_df):
     if runs_df.empty:
         return pd.DataFrame(columns=['Ticker', 'AvgBullDuration', 'MedianBullDuration'])
@@ -4,18 +4,20 @@ import json
 import yfinance as yf
 
 
-def get_stock_data(tickers: list[str], start: str = "2010-01-01", end: str = None) -> pd.DataFrame:
+def get_stock_data(tickers: list[str], start: str = "2010-01-01", end: str = None,
+                   interval: str = "1d") -> pd.DataFrame:
     """
     Retrieves stock price and volume from yfinance.
     Args:
         tickers:list of tickers
         start:starting date from which retrieves data for. Format YYYY-MM-DD.
         end:latest date for which retrieves data. Format YYYY-MM-DD.
+        interval:bar size, e.g. "1d", "1h", "5m", "1m". Intraday bar timestamps go in the Date column.
     Returns:
         Dataframe with extracted data.
 
     """
-    df = yf.download(tickers, start=start, end=end, auto_adjust=True)
+    df = yf.download(tickers, start=start, end=end, interval=interval, auto_adjust=True)
     df = df.reset_index()
     df.columns = ['Date'] + [f"{col[0]}_{col[1]}" for col in df.columns[1:]]
     df_long = df.melt(id_vars=["Date"], var_name="Feature_Ticker", value_name="Value")
@@ -27,6 +29,44 @@ def get_stock_data(tickers: list[str], start: str = "2010-01-01", end: str = Non
     df_clean = df_clean.dropna()
     return df_clean
 
+def iter_stock_data(tickers: list[str], start: str, end: str = None, interval: str = "1m",
+                    window_days: int = 7):
+    """
+    Streams bars from yfinance one time window at a time, so intraday history never
+    has to be held in memory at once. yfinance serves 1m bars in windows of at most
+    7 days (and only for recent weeks), hence the default window.
+    Args:
+        tickers:list of tickers
+        start:first date to retrieve. Format YYYY-MM-DD.
+        end:last date (exclusive). Defaults to today.
+        interval:bar size passed to yfinance.
+        window_days:number of calendar days per download.
+    Returns:
+        Generator of long dataframes (Date, Ticker, OHLCV), in time order.
+    """
+    window_start = pd.Timestamp(start)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    while window_start < end:
+        window_end = min(window_start + pd.Timedelta(days=window_days), end)
+        chunk = get_stock_data(tickers, start=window_start.strftime("%Y-%m-%d"),
+                               end=window_end.strftime("%Y-%m-%d"), interval=interval)
+        if not chunk.empty:
+            yield chunk
+        window_start = window_end
+
+
+def iter_csv_bars(path: str, chunksize: int = 1_000_000):
+    """
+    Streams a stored long bar file (Date, Ticker, OHLCV) written in time order.
+    Args:
+        path:CSV file with the bars.
+        chunksize:number of rows per chunk.
+    Returns:
+        Generator of dataframes.
+    """
+    for chunk in pd.read_csv(path, parse_dates=["Date"], chunksize=chunksize):
+        yield chunk
+
 # -------------------------
 # 2) Load fundamentals from JSONs
 # -------------------------
@@ -45,8 +85,8 @@ def load_fundamentals(json_folder, columns_needed):
     return fundamentals_df
 
 
-
-df=get_stock_data(['AAPL', 'TSLA'])
-print(df.shape)
-print(df.info())
-print(df.columns.to_list())
+if __name__ == "__main__":
+    df = get_stock_data(['AAPL', 'TSLA'])
+    print(df.shape)
+    print(df.info())
+    print(df.columns.to_list())
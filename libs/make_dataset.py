@@ -5,12 +5,56 @@ import os
 from libs.data_loader import get_stock_data  # your loader
 from libs.bull_detector import detect_and_label_bull_runs  # your bull detector
 
+def rolling_mean(values, window):
+    """
+    Trailing mean over `window` values, NaN for the first window - 1 values.
+    Each window is averaged on its own (no running sum), so a chunk prefixed with
+    the previous values gives exactly the same results as the full series.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window).mean(axis=1)
+    return out
+
 def compute_rsi(series, period=14):
     delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    gain = rolling_mean(delta.where(delta > 0, 0), period)
+    loss = rolling_mean(-delta.where(delta < 0, 0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+    return pd.Series(100 - (100 / (1 + rs)), index=series.index)
+
+class IndicatorStream:
+    """
+    Computes the SMA and RSI features chunk by chunk for data too large for memory
+    (e.g. minute bars). The last closes of every ticker are carried across chunk
+    boundaries, so the output matches computing the features on the full history.
+    """
+
+    def __init__(self, sma_windows=(20, 50), rsi_period=14):
+        self.sma_windows = tuple(sma_windows)
+        self.rsi_period = rsi_period
+        self.lookback = max(self.sma_windows + ((rsi_period + 1,) if rsi_period else ()))
+        self.tails = {}  # Ticker -> last closes
+
+    def update(self, chunk):
+        """
+        Adds SMA_<window> and RSI_<period> columns to a time-ordered chunk of bars.
+        """
+        out = []
+        for ticker, tdf in chunk.sort_values('Date', kind='stable').groupby('Ticker', sort=False):
+            tail = self.tails.get(ticker, np.empty(0))
+            close = np.concatenate([tail, tdf['Close'].to_numpy(dtype=float)])
+            self.tails[ticker] = close[-self.lookback:]
+
+            tdf = tdf.copy()
+            for window in self.sma_windows:
+                tdf[f'SMA_{window}'] = rolling_mean(close, window)[len(tail):]
+            if self.rsi_period:
+                tdf[f'RSI_{self.rsi_period}'] = compute_rsi(pd.Series(close), self.rsi_period).to_numpy()[len(tail):]
+            out.append(tdf)
+        return pd.concat(out, ignore_index=True) if out else chunk.iloc[0:0]
 
 def generate_labels(close_prices, sl, tp, max_holding):
     n = len(close_prices)
@@ -59,8 +103,8 @@ def make_dataset(sl=0.03, tp=0.05, max_holding=20, tickers=None,
     df_clean = df_clean.sort_values(["Ticker", "Date"]).reset_index(drop=True)
 
     # --- Compute features ---
-    df_clean["SMA_20"] = df_clean.groupby("Ticker")["Close"].transform(lambda x: x.rolling(20).mean())
-    df_clean["SMA_50"] = df_clean.groupby("Ticker")["Close"].transform(lambda x: x.rolling(50).mean())
+    df_clean["SMA_20"] = df_clean.groupby("Ticker")["Close"].transform(lambda x: rolling_mean(x, 20))
+    df_clean["SMA_50"] = df_clean.groupby("Ticker")["Close"].transform(lambda x: rolling_mean(x, 50))
     df_clean["RSI_14"] = df_clean.groupby("Ticker")["Close"].transform(lambda x: compute_rsi(x, 14))
     # TODO: Add more indicators here later
 
@@ -0,0 +1,136 @@
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+import joblib
+import pandas as pd
+
+from libs.trade_predictor import TradePredictor, iter_labeled_chunks
+
+
+MODEL_PREFIX = "trade_model_v"
+
+
+class ModelRegistry:
+    """
+    Stores versioned TradePredictor artifacts in a folder.
+    Every version is a `trade_model_vNNNN.joblib` file plus a `.json` file with the
+    feature schema, training watermarks and bookkeeping. Both are written to temporary
+    names and renamed into place, metadata last, and versions are listed from the
+    metadata files, so readers never see a half-written version.
+    """
+
+    def __init__(self, model_dir: str = "models"):
+        self.model_dir = model_dir
+        os.makedirs(model_dir, exist_ok=True)
+
+    def _path(self, version: int, ext: str) -> str:
+        return os.path.join(self.model_dir, f"{MODEL_PREFIX}{version:04d}.{ext}")
+
+    def versions(self) -> list[int]:
+        pattern = re.compile(rf"{MODEL_PREFIX}(\d+)\.json$")
+        found = (pattern.search(os.path.basename(f))
+                 for f in glob.glob(os.path.join(self.model_dir, f"{MODEL_PREFIX}*.json")))
+        return sorted(int(m.group(1)) for m in found if m)
+
+    def latest_version(self) -> int | None:
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def save(self, predictor: TradePredictor, max_holding: int, source: str = None) -> int:
+        """
+        Persists the predictor as the next version.
+        Returns:
+            The new version number.
+        """
+        version = (self.latest_version() or 0) + 1
+        model_path, metadata_path = self._path(version, "joblib"), self._path(version, "json")
+        joblib.dump(predictor, model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        metadata = {
+            'version': version,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'features': predictor.features,
+            'max_holding': max_holding,
+            'n_samples_seen': predictor.n_samples_seen,
+            'watermarks': {t: d.strftime('%Y-%m-%d') for t, d in predictor.watermarks.items()},
+            'source': source,
+        }
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f, indent=4)
+        os.replace(metadata_path + ".tmp", metadata_path)
+        print(f"[+] Model version {version} saved to {model_path}")
+        return version
+
+    def load_metadata(self, version: int = None) -> dict:
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No model versions in {self.model_dir}")
+        with open(self._path(version, "json")) as f:
+            return json.load(f)
+
+    def load(self, version: int = None, features: list[str] = None) -> TradePredictor:
+        """
+        Loads a model version (latest by default).
+        Args:
+            version: version number to load.
+            features: expected feature columns; raises ValueError if the stored schema differs.
+        """
+        metadata = self.load_metadata(version)
+        if features is not None and list(features) != metadata['features']:
+            raise ValueError(f"Feature schema mismatch: model v{metadata['version']} uses "
+                             f"{metadata['features']}, got {list(features)}")
+        return joblib.load(self._path(metadata['version'], "joblib"))
+
+
+def iter_labeled_chunks_from_frame(df: pd.DataFrame, max_holding: int, features: list[str]):
+    """Same filtering as iter_labeled_chunks for an in-memory dataset."""
+    df = df.sort_values(['Ticker', 'Date'])
+    bars_after = df.groupby('Ticker').cumcount(ascending=False)
+    final = df[bars_after >= max_holding]
+    final = final[(final['Label'] != -1) & final[features].notna().all(axis=1)]
+    if not final.empty:
+        yield final
+
+
+def update_model(dataset, model_dir: str = "models", max_holding: int = 20,
+                 chunksize: int = 100_000) -> int:
+    """
+    Folds newly labeled bars into the latest model and saves it as a new version.
+    Only bars dated after the model's per-ticker watermark are used, so a daily
+    update touches a few rows per ticker instead of the whole history. If no model
+    exists yet, a new one is trained on the whole dataset, streamed in chunks.
+    Args:
+        dataset: path to a make_dataset CSV, or a dataframe with the same columns.
+        model_dir: folder holding the versioned models.
+        max_holding: holding horizon used to build the labels.
+        chunksize: number of CSV rows read at a time.
+    Returns:
+        Version number of the saved model (the current one if nothing was new).
+    """
+    registry = ModelRegistry(model_dir)
+    source = dataset if isinstance(dataset, str) else None
+
+    if registry.latest_version() is None:
+        predictor = TradePredictor()
+    else:
+        metadata = registry.load_metadata()
+        if metadata['max_holding'] != max_holding:
+            raise ValueError(f"Model was trained with max_holding={metadata['max_holding']}, got {max_holding}")
+        predictor = registry.load(metadata['version'])
+
+    if isinstance(dataset, str):
+        chunks = iter_labeled_chunks(dataset, max_holding, predictor.features, chunksize)
+    else:
+        chunks = iter_labeled_chunks_from_frame(dataset, max_holding, predictor.features)
+
+    n_before = predictor.n_samples_seen
+    for chunk in chunks:
+        predictor.partial_fit(predictor.unseen_rows(chunk))
+    n_new = predictor.n_samples_seen - n_before
+    print(f"[+] Folded {n_new} new bars into the model")
+    if n_new == 0 and registry.latest_version() is not None:
+        return registry.latest_version()
+    return registry.save(predictor, max_holding, source)
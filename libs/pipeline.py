@@ -0,0 +1,192 @@
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+from logging import Logger
+
+import pandas as pd
+
+
+def hash_files(pattern: str) -> str:
+    """
+    Content hash of every file matching a glob pattern, for use as a stage parameter
+    when a stage reads files from disk (e.g. the fundamentals JSONs).
+    """
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(pattern)):
+        h.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _to_json(value):
+    # hash the full contents, repr() elides the middle of large frames and arrays
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        h = hashlib.sha256(pd.util.hash_pandas_object(value).values.tobytes())
+        if isinstance(value, pd.DataFrame):
+            h.update(repr(list(value.columns)).encode())  # row hashes ignore the column labels
+        return h.hexdigest()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return repr(value)
+
+
+def _code_hash(*objects) -> str:
+    """Hash of the source of functions, classes or modules (their name if it is unavailable)."""
+    h = hashlib.sha256()
+    for obj in objects:
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = getattr(obj, '__qualname__', None) or getattr(obj, '__name__', repr(obj))
+        h.update(source.encode())
+    return h.hexdigest()
+
+
+class Stage:
+    """
+    One pipeline step: `func(**inputs, **params)` where inputs are the outputs of the
+    named upstream stages.
+    """
+
+    def __init__(self, name: str, func, inputs=(), params: dict = None, cache: bool = True,
+                 code_deps=(), version=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = params or {}
+        self.cache = cache
+        self.code_deps = list(code_deps)
+        self.version = version
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order and memoizes every stage output on disk.
+    A stage's cache key hashes its name, its code, its parameters and the keys of its
+    inputs, so changing one parameter only recomputes that stage and the stages
+    downstream of it. The cache is trimmed to `max_bytes` / `max_entries` by evicting
+    the least recently used entries.
+
+    Only the source of the stage function itself is hashed, not the code it calls: list
+    the modules or functions a stage delegates to in `code_deps` to have edits to them
+    invalidate the stage, or bump its `version` by hand.
+    """
+
+    def __init__(self, cache_dir: str = ".pipeline_cache", max_bytes: int = 2 * 1024 ** 3,
+                 max_entries: int = None, logger: Logger = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.logger = logger or logging.getLogger(__name__)
+        self.stages = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def add(self, name: str, func, inputs=(), params: dict = None, cache: bool = True,
+            code_deps=(), version=None) -> Stage:
+        """
+        Declares a stage. Inputs must name stages added before it.
+        Args:
+            code_deps: modules or functions called by func whose source is part of the key.
+            version: free-form tag that is part of the key, to invalidate the stage by hand.
+        """
+        missing = [i for i in inputs if i not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        stage = Stage(name, func, inputs, params, cache, code_deps, version)
+        self.stages[name] = stage
+        return stage
+
+    def set_params(self, name: str, **params):
+        """Updates parameters of an existing stage."""
+        self.stages[name].params.update(params)
+
+    def stage_key(self, name: str) -> str:
+        """Content hash identifying the output of a stage."""
+        return self._key(name, {})
+
+    def _key(self, name: str, keys: dict) -> str:
+        if name not in keys:
+            stage = self.stages[name]
+            payload = json.dumps({
+                'name': name,
+                'code': _code_hash(stage.func, *stage.code_deps),
+                'version': stage.version,
+                'params': stage.params,
+                'inputs': {i: self._key(i, keys) for i in stage.inputs},
+            }, sort_keys=True, default=_to_json)
+            keys[name] = hashlib.sha256(payload.encode()).hexdigest()
+        return keys[name]
+
+    def _path(self, name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}-{key[:20]}.pkl")
+
+    def run(self, targets=None) -> dict:
+        """
+        Computes the target stages and what they depend on. Defaults to the final stages
+        (those no other stage uses); cached upstream outputs are only loaded if needed.
+        Returns:
+            Dict of stage name -> output for every stage that was loaded or computed.
+        """
+        if targets is None:
+            used = {i for stage in self.stages.values() for i in stage.inputs}
+            targets = [name for name in self.stages if name not in used]
+        elif isinstance(targets, str):
+            targets = [targets]
+        keys, results = {}, {}
+
+        def compute(name):
+            if name in results:
+                return results[name]
+            stage = self.stages[name]
+            key = self._key(name, keys)
+            path = self._path(name, key)
+            if stage.cache and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    results[name] = pickle.load(f)
+                os.utime(path)  # mark as recently used
+                self.logger.info(f"[cache hit] {name} ({key[:12]})")
+                return results[name]
+
+            inputs = {i: compute(i) for i in stage.inputs}
+            self.logger.info(f"[compute] {name} ({key[:12]})")
+            results[name] = stage.func(**inputs, **stage.params)
+            if stage.cache:
+                self._store(path, results[name])
+            return results[name]
+
+        for target in targets:
+            compute(target)
+        self.evict()
+        return results
+
+    def _store(self, path: str, value):
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def evict(self):
+        """Deletes least recently used entries until the size and count limits hold."""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pkl")):
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or
+                           (self.max_entries is not None and len(entries) > self.max_entries)):
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total -= size
+            self.logger.info(f"[evict] {os.path.basename(path)}")
+
+    def clear(self):
+        """Removes every cached entry."""
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pkl")):
+            os.remove(path)
@@ -0,0 +1,319 @@
+import itertools
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from libs.safety_checks import RiskEngine
+from libs.signal_gen import SignalStream
+from libs.trading_engine import TradingEngine
+
+
+STAGES = ['label', 'signals', 'orders', 'total']
+
+
+def synthetic_bars(n_tickers: int, n_bars: int, start: str = "2024-01-02 09:30", freq: str = "min",
+                   drift: float = 0.00002, volatility: float = 0.001, seed: int = None) -> pd.DataFrame:
+    """
+    Random-walk OHLCV bars for a universe of synthetic tickers.
+    Returns:
+        Long dataframe (Date, Ticker, Open, High, Low, Close, Volume) sorted by Date.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=n_bars, freq=freq)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, volatility, (n_bars, n_tickers)), axis=0))
+    open_ = np.vstack([close[:1], close[:-1]])
+    spread = np.abs(rng.normal(0, volatility, (n_bars, n_tickers))) * close
+    return pd.DataFrame({
+        'Date': np.repeat(dates, n_tickers),
+        'Ticker': np.tile(tickers, n_bars),
+        'Open': open_.ravel(),
+        'High': (np.maximum(open_, close) + spread).ravel(),
+        'Low': (np.minimum(open_, close) - spread).ravel(),
+        'Close': close.ravel(),
+        'Volume': rng.integers(1_000, 100_000, n_bars * n_tickers).astype(float),
+    })
+
+
+class FakeAlpacaREST:
+    """
+    Local stand-in for the alpaca REST endpoints TradingEngine uses. Market orders fill
+    immediately at the last replayed price; bracket legs fill when a replayed bar's
+    High/Low crosses them (the stop loss first if both do). Every call can sleep
+    `latency_ms` to mimic the network round trip.
+    """
+
+    def __init__(self, cash: float = 100_000, latency_ms: float = 0.0):
+        self.cash = cash
+        self.latency_ms = latency_ms
+        self.positions = {}  # symbol -> qty
+        self.brackets = {}  # symbol -> (take profit, stop loss) of the open position
+        self.prices = {}
+        self.orders = []
+        self._ids = itertools.count(1)
+        self.last_equity = cash
+
+    def _wait(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def set_prices(self, prices: dict, highs: dict = None, lows: dict = None):
+        """Updates last prices and fills the bracket legs crossed by the bar's High/Low."""
+        self.prices.update(prices)
+        if highs is None or lows is None:
+            return
+        for symbol, (take_profit, stop_loss) in list(self.brackets.items()):
+            if symbol not in highs:
+                continue
+            long = self.positions[symbol] > 0
+            if (lows[symbol] <= stop_loss) if long else (highs[symbol] >= stop_loss):
+                self._close(symbol, stop_loss)
+            elif (highs[symbol] >= take_profit) if long else (lows[symbol] <= take_profit):
+                self._close(symbol, take_profit)
+
+    def _close(self, symbol: str, price: float):
+        self.cash += self.positions.pop(symbol, 0) * price
+        self.brackets.pop(symbol, None)
+
+    def _equity(self) -> float:
+        return self.cash + sum(qty * self.prices.get(s, 0.0) for s, qty in self.positions.items())
+
+    def start_day(self):
+        """Resets the start-of-day equity used for the daily loss limit."""
+        self.last_equity = self._equity()
+
+    def get_account(self):
+        self._wait()
+        return SimpleNamespace(cash=str(self.cash), equity=str(self._equity()), last_equity=str(self.last_equity))
+
+    def list_positions(self):
+        self._wait()
+        return [SimpleNamespace(symbol=s, qty=str(qty), market_value=str(qty * self.prices.get(s, 0.0)))
+                for s, qty in self.positions.items() if qty]
+
+    def submit_order(self, symbol, qty, side, type="market", time_in_force="gtc", order_class=None,
+                     take_profit=None, stop_loss=None, **kwargs):
+        self._wait()
+        price = self.prices[symbol]
+        signed = qty if side == "buy" else -qty
+        self.positions[symbol] = self.positions.get(symbol, 0) + signed
+        self.cash -= signed * price
+        if order_class == "bracket":
+            self.brackets[symbol] = (take_profit["limit_price"], stop_loss["stop_price"])
+        order = SimpleNamespace(id=str(next(self._ids)), symbol=symbol, qty=str(qty), side=side, type=type,
+                                order_class=order_class, take_profit=take_profit, stop_loss=stop_loss,
+                                filled_avg_price=str(price), status="filled")
+        self.orders.append(order)
+        return order
+
+    def close_position(self, symbol: str):
+        self._wait()
+        qty = self.positions.get(symbol, 0)
+        self._close(symbol, self.prices[symbol])
+        return SimpleNamespace(id=str(next(self._ids)), symbol=symbol, qty=str(abs(qty)),
+                               side="sell" if qty > 0 else "buy", status="filled")
+
+    def cancel_all_orders(self):
+        self._wait()
+        self.brackets = {}
+
+    def close_all_positions(self):
+        self._wait()
+        for symbol in list(self.positions):
+            self._close(symbol, self.prices.get(symbol, 0.0))
+
+
+def replay_risk_engine(allocation: float = 0.02, cash: float = 1_000_000, headroom: float = 2.0,
+                       **limits) -> RiskEngine:
+    """
+    RiskEngine with position limits sized to the replay's per-position allocation.
+    The RiskEngine() defaults (10k per position, 10% of equity) are meant for a small
+    live account and would reject every replay order at the default allocation and cash.
+    The duplicate window is measured in wall-clock seconds, which a fast replay covers in
+    a fraction of a bar, so it is off by default (duplicates within a batch are still
+    rejected).
+    Args:
+        allocation, cash: the MarketReplay settings the limits are sized for.
+        headroom: limits as a multiple of one allocation, so orders pass while equity drifts.
+        limits: any other RiskEngine argument.
+    """
+    limits.setdefault('duplicate_window_sec', 0)
+    return RiskEngine(max_position_value=allocation * cash * headroom,
+                      max_ticker_pct=allocation * headroom, **limits)
+
+
+class MarketReplay:
+    """
+    Replays bars through the live decision loop without external services:
+    SignalStream (bull-run labels + SMA crossover) -> bracket orders for buy signals and
+    position exits for sell signals -> TradingEngine backed by FakeAlpacaREST. Bars are
+    released one timestamp at a time, either as fast as possible or paced at `speed`
+    times real time, and the latency of every stage is recorded per bar.
+    """
+
+    def __init__(self, bars: pd.DataFrame, bar_seconds: float = 60, speed: float = None,
+                 warmup_bars: int = 100, trend_window: int = 30, slope_threshold_ppd: float = 0.00005,
+                 min_bull_duration_days: int = 10, short_window: int = 20, long_window: int = 50,
+                 allocation: float = 0.02, take_profit: float = 0.005, stop_loss: float = 0.003,
+                 risk_engine: RiskEngine = None, api_latency_ms: float = 0.0, cash: float = 1_000_000):
+        """
+        Args:
+            bars: long dataframe (Date, Ticker, OHLCV), e.g. get_stock_data or synthetic_bars.
+            bar_seconds: real-time length of one bar; it is the per-bar budget of the live loop.
+            speed: replay speed as a multiple of real time; None replays as fast as possible.
+            warmup_bars: leading bars fed untimed to fill the rolling windows.
+            allocation: fraction of equity per new position.
+            take_profit, stop_loss: bracket distances from the entry price, sized for minute
+                bars so the legs fill during a replay of a few hundred bars.
+            risk_engine: optional pre-trade RiskEngine on the order path. Its limits must fit
+                `allocation` x `cash`, see replay_risk_engine(); with the RiskEngine()
+                defaults every order is rejected and no submission is timed.
+            api_latency_ms: simulated round trip of every broker call.
+        """
+        self.bar_seconds = bar_seconds
+        self.speed = speed
+        self.allocation = allocation
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.stream = SignalStream(trend_window, slope_threshold_ppd, min_bull_duration_days,
+                                   short_window=short_window, long_window=long_window)
+        self.api = FakeAlpacaREST(cash=cash, latency_ms=api_latency_ms)
+        self.engine = TradingEngine(None, None, risk_engine=risk_engine, api=self.api)
+
+        # split the feed per timestamp up front, as a live feed would deliver it
+        bars = bars.sort_values('Date', kind='stable')
+        self.chunks = [chunk for _, chunk in bars.groupby('Date', sort=True)]
+        self.warmup_bars = min(warmup_bars, len(self.chunks))
+        self.n_tickers = bars['Ticker'].nunique()
+
+    def _orders(self, current: pd.DataFrame, held: set) -> pd.DataFrame:
+        """Bracket buy orders for buy signals of tickers not held yet."""
+        buys = current[(current['signal'] == 1) & ~current['Ticker'].isin(held)]
+        if buys.empty:
+            return buys
+        price = buys['Close'].to_numpy(dtype=float)
+        qty = np.floor(self.allocation * float(self.engine.get_account_info().equity) / price)
+        orders = pd.DataFrame({
+            'Symbol': buys['Ticker'].to_numpy(),
+            'Qty': qty,
+            'Side': 'buy',
+            'TakeProfit': np.round(price * (1 + self.take_profit), 2),
+            'StopLoss': np.round(price * (1 - self.stop_loss), 2),
+            'LastPrice': price,
+        })
+        return orders[orders['Qty'] > 0]
+
+    def run(self) -> pd.DataFrame:
+        """
+        Replays every bar after the warmup.
+        Returns:
+            One row per bar with Date, Tickers, Orders (entries), Exits, per-stage latencies
+            in ms (label, signals, orders, total) and Behind (the bar missed its paced slot).
+        """
+        if self.warmup_bars:
+            warmup = pd.concat(self.chunks[:self.warmup_bars], ignore_index=True)
+            self.api.set_prices(dict(zip(warmup['Ticker'], warmup['Close'])))
+            self.stream.update(warmup)
+        self.api.start_day()
+
+        interval = self.bar_seconds / self.speed if self.speed else 0.0
+        records = []
+        start = time.perf_counter()
+        for k, chunk in enumerate(self.chunks[self.warmup_bars:]):
+            scheduled = start + k * interval
+            behind = False
+            if interval:
+                wait = scheduled - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    behind = True
+            self.api.set_prices(dict(zip(chunk['Ticker'], chunk['Close'])),
+                                highs=dict(zip(chunk['Ticker'], chunk['High'])),
+                                lows=dict(zip(chunk['Ticker'], chunk['Low'])))
+            date = chunk['Date'].iloc[0]
+
+            t0 = time.perf_counter()
+            labeled = self.stream.label(chunk)
+            t1 = time.perf_counter()
+            signals = self.stream.signals(labeled)
+            t2 = time.perf_counter()
+            submitted, closed = [], []
+            current = signals[signals['Date'] == date] if not signals.empty else signals
+            if not current.empty:
+                held = {p.symbol for p in self.engine.get_positions()}
+                exits = current.loc[(current['signal'] == -1) & current['Ticker'].isin(held), 'Ticker'].tolist()
+                closed = self.engine.close_positions(exits) if exits else []
+                orders = self._orders(current, held.difference(exits))
+                submitted = self.engine.place_orders(orders) if not orders.empty else []
+            t3 = time.perf_counter()
+
+            records.append({'Date': date, 'Tickers': len(chunk), 'Orders': len(submitted), 'Exits': len(closed),
+                            'label': (t1 - t0) * 1000, 'signals': (t2 - t1) * 1000,
+                            'orders': (t3 - t2) * 1000, 'total': (t3 - t0) * 1000, 'Behind': behind})
+        self.elapsed = time.perf_counter() - start
+        return pd.DataFrame(records)
+
+
+def summarize_latencies(records: pd.DataFrame, elapsed: float = None) -> dict:
+    """
+    Latency percentiles (ms) per stage and throughput for one replay.
+    Args:
+        records: output of MarketReplay.run().
+        elapsed: wall time of the replay; defaults to the summed processing time.
+    """
+    summary = {'Bars': len(records), 'Orders': int(records['Orders'].sum()), 'Exits': int(records['Exits'].sum()),
+               'ActiveBarsPct': ((records['Orders'] + records['Exits']) > 0).mean() * 100}
+    for stage in STAGES:
+        p50, p95, p99 = np.percentile(records[stage], [50, 95, 99])
+        summary.update({f'{stage}_p50_ms': p50, f'{stage}_p95_ms': p95, f'{stage}_p99_ms': p99})
+    summary['total_max_ms'] = records['total'].max()
+    elapsed = elapsed or records['total'].sum() / 1000
+    summary['BarsPerSec'] = len(records) / elapsed
+    summary['TickerBarsPerSec'] = records['Tickers'].sum() / elapsed
+    summary['BehindPct'] = records['Behind'].mean() * 100
+    return summary
+
+
+def sweep_universe(sizes, n_bars: int = 400, bar_seconds: float = 60, speed: float = None,
+                   seed: int = 0, risk_checks: bool = False, **replay_kwargs) -> pd.DataFrame:
+    """
+    Replays synthetic bars for growing universe sizes.
+    KeepsUp tells whether the p99 end-to-end latency fits the per-bar budget
+    (bar_seconds / speed, or bar_seconds for a live loop when speed is None).
+    With risk_checks every replay gets a fresh replay_risk_engine() on the order path.
+    Returns:
+        One row per universe size with latency percentiles and throughput.
+    """
+    budget_ms = bar_seconds * 1000 / (speed or 1)
+    rows = []
+    for size in sizes:
+        bars = synthetic_bars(size, n_bars, seed=seed)
+        if risk_checks:
+            replay_kwargs['risk_engine'] = replay_risk_engine(replay_kwargs.get('allocation', 0.02),
+                                                              replay_kwargs.get('cash', 1_000_000))
+        replay = MarketReplay(bars, bar_seconds=bar_seconds, speed=speed, **replay_kwargs)
+        records = replay.run()
+        summary = summarize_latencies(records, replay.elapsed if speed else None)
+        summary.update({'Universe': size, 'Budget_ms': budget_ms,
+                        'KeepsUp': summary['total_p99_ms'] <= budget_ms})
+        rows.append(summary)
+    df = pd.DataFrame(rows)
+    return df[['Universe'] + [c for c in df.columns if c != 'Universe']]
+
+
+def max_sustainable_universe(sweep_df: pd.DataFrame):
+    """Largest universe size in a sweep whose p99 latency still fits the budget (None if none do)."""
+    ok = sweep_df[sweep_df['KeepsUp']]
+    return int(ok['Universe'].max()) if not ok.empty else None
+
+
+if __name__ == "__main__":
+    # bar_seconds=1 makes the budget tight enough to find a breaking point on a laptop
+    sweep_df = sweep_universe([10, 50, 100, 250, 500], n_bars=200, bar_seconds=1, risk_checks=True)
+    pd.set_option('display.width', 200)
+    print(sweep_df[['Universe', 'BarsPerSec', 'TickerBarsPerSec', 'label_p99_ms', 'signals_p99_ms',
+                    'orders_p99_ms', 'total_p50_ms', 'total_p99_ms', 'KeepsUp']])
+    print(f"Largest universe keeping up: {max_sustainable_universe(sweep_df)}")
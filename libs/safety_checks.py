@@ -0,0 +1,314 @@
+import logging
+import time
+from logging import Logger
+
+import numpy as np
+import pandas as pd
+
+
+LIMIT_COLUMNS = ['MaxPositionValue', 'MaxPositionPct', 'Sector']
+
+
+def _group_levels(groups: np.ndarray) -> list:
+    """
+    Splits the positions of an array into levels: level k holds the k-th element of every
+    group that has more than k elements, paired with the previous element of its group.
+    """
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    position = np.arange(len(order))
+    starts = np.concatenate([[True], sorted_groups[1:] != sorted_groups[:-1]])
+    rank = position - np.maximum.accumulate(np.where(starts, position, 0))
+    levels = []
+    for k in range(1, rank.max() + 1 if len(rank) else 0):
+        at = np.flatnonzero(rank == k)
+        levels.append((order[at], order[at - 1]))
+    return levels
+
+
+def _running_sum(values: np.ndarray, levels: list) -> np.ndarray:
+    """
+    Running sum of values within each group, in array order, for the levels of
+    _group_levels. Sums are built one level at a time, so the result is exactly the
+    sequential sum whatever the other groups hold.
+    """
+    total = values.astype(float)
+    for at, previous in levels:
+        total[at] += total[previous]
+    return total
+
+
+class RiskEngine:
+    """
+    Pre-trade risk checks for a batch of proposed bracket orders.
+    Limits live in an in-memory table indexed by ticker (tickers without a row use the
+    defaults) that is compiled into arrays plus a ticker -> row dict, and every check is
+    an array operation over the whole batch. The order path calls check() with arrays;
+    check_orders() is a dataframe front end on top of it.
+
+    Checks:
+        - max_position:   post-trade position value above the ticker's MaxPositionValue
+        - ticker_concentration: post-trade position above MaxPositionPct of equity
+        - sector_concentration: post-trade sector exposure above max_sector_pct of equity
+        - daily_loss_limit: equity down more than max_daily_loss_pct since start of day
+                            (orders that reduce a position still go through)
+        - bracket: stop loss / take profit on the wrong side of, or too far from, the last price
+        - duplicate: same symbol and side twice in the batch or submitted within duplicate_window_sec
+        - invalid_order: missing symbol, non-positive quantity or price, or unknown side
+    """
+
+    def __init__(self, max_position_value: float = 10_000, max_ticker_pct: float = 0.10,
+                 max_sector_pct: float = 0.30, max_daily_loss_pct: float = 0.03,
+                 max_bracket_pct: float = 0.25, duplicate_window_sec: float = 60,
+                 limits: pd.DataFrame = None, logger: Logger = None):
+        self.max_position_value = max_position_value
+        self.max_ticker_pct = max_ticker_pct
+        self.max_sector_pct = max_sector_pct
+        self.max_daily_loss_pct = max_daily_loss_pct
+        self.max_bracket_pct = max_bracket_pct
+        self.duplicate_window_sec = duplicate_window_sec
+        self.logger = logger or logging.getLogger(__name__)
+        self.limits = pd.DataFrame(columns=LIMIT_COLUMNS, index=pd.Index([], name='Ticker'))
+        self._submitted = {}  # (symbol, side) -> submit time
+        self._build_index()
+        if limits is not None:
+            self.set_limits(limits)
+
+    def _build_index(self):
+        """Compiles the limits table into arrays looked up by a ticker -> row dict."""
+        self._row = {ticker: i for i, ticker in enumerate(self.limits.index)}
+        self._max_value = self.limits['MaxPositionValue'].to_numpy(dtype=float)
+        self._max_pct = self.limits['MaxPositionPct'].to_numpy(dtype=float)
+        sector = self.limits['Sector']
+        self._sector_names = sorted(sector.dropna().unique())
+        sector_ids = {name: i for i, name in enumerate(self._sector_names)}
+        self._sector = np.array([sector_ids.get(x, -1) for x in sector], dtype=np.int64)
+
+    def _rows(self, tickers) -> np.ndarray:
+        """Limits table row of every ticker, -1 for tickers without one."""
+        return np.fromiter((self._row.get(t, -1) for t in tickers), dtype=np.int64, count=len(tickers))
+
+    def set_limits(self, limits: pd.DataFrame):
+        """
+        Adds or updates per-ticker limits.
+        Args:
+            limits: dataframe indexed by Ticker with any of MaxPositionValue,
+                MaxPositionPct and Sector columns. Missing values keep the previous
+                value, or the engine default if there is none.
+        """
+        limits = limits.reindex(columns=LIMIT_COLUMNS).astype(object)
+        self.limits = limits.combine_first(self.limits.astype(object))
+        self.limits.index.name = 'Ticker'
+        self._build_index()
+
+    def set_sectors(self, sectors: dict):
+        """Maps tickers to sectors for the sector concentration check."""
+        self.set_limits(pd.DataFrame({'Sector': pd.Series(sectors)}))
+
+    def record_submitted(self, symbols, sides, now: float = None):
+        """Remembers submitted orders for duplicate detection."""
+        now = time.time() if now is None else now
+        for symbol, side in zip(symbols, sides):
+            self._submitted[(symbol, side.lower())] = now
+
+    def check(self, symbols, sides, qty, take_profit, stop_loss, last_price, equity: float,
+              start_equity: float = None, positions: dict = None, now: float = None):
+        """
+        Checks a batch of proposed orders given as parallel arrays.
+        Orders that fail an order-level check (invalid, bracket, duplicate, daily loss) do
+        not count towards exposure. The exposure checks apply the remaining orders in batch
+        order and only reject the orders that take a ticker or sector over its limit.
+        Args:
+            symbols, sides, qty, take_profit, stop_loss, last_price: one entry per order.
+            equity: current account equity.
+            start_equity: equity at the start of the trading day (defaults to equity).
+            positions: current position market value per symbol (negative for shorts).
+            now: timestamp used for duplicate detection, defaults to time.time().
+        Returns:
+            (accepted bool array, array of rejection reasons, '' for accepted orders).
+        """
+        now = time.time() if now is None else now
+        start_equity = equity if start_equity is None else start_equity
+        positions = {} if positions is None else positions
+        symbols = np.asarray(symbols, dtype=object)
+        n = len(symbols)
+        if n == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=object)
+        # missing sides get factorize code -1, which picks the '' appended at the end
+        side_codes, side_names = pd.factorize(np.asarray(sides, dtype=object))
+        side = np.append(np.char.lower(side_names.astype(str)), '')[side_codes]
+        qty = np.asarray(qty, dtype=float)
+        last = np.asarray(last_price, dtype=float)
+        tp = np.asarray(take_profit, dtype=float)
+        sl = np.asarray(stop_loss, dtype=float)
+
+        is_buy = side == 'buy'
+        is_sell = side == 'sell'
+        self._submitted = {k: t for k, t in self._submitted.items() if now - t <= self.duplicate_window_sec}
+        recent_symbols = np.array([symbol for symbol, _ in self._submitted], dtype=object)
+        recent_sides = np.array([side for _, side in self._submitted], dtype=object)
+        held_symbols = np.asarray(list(positions), dtype=object)
+        held_value = np.fromiter(positions.values(), dtype=float, count=len(held_symbols))
+
+        # one hash pass codes the batch, held and recent symbols; batch tickers come first
+        all_codes, all_tickers = pd.factorize(np.concatenate([symbols, held_symbols, recent_symbols]))
+        codes = all_codes[:n].copy()
+        n_batch = codes.max() + 1
+        held_codes = all_codes[n:n + len(held_symbols)]
+        recent_codes = all_codes[n + len(held_symbols):]
+        all_rows = self._rows(all_tickers)
+        rows = all_rows[:n_batch]
+        # missing symbols (code -1) share an extra slot with no limits row and no position
+        missing_symbol = codes < 0
+        n_tickers = n_batch + missing_symbol.any()
+        if missing_symbol.any():
+            codes[missing_symbol] = n_batch
+            rows = np.append(rows, -1)
+        checks = []
+
+        # --- order sanity ---
+        invalid = missing_symbol | ~(is_buy | is_sell) | ~(qty > 0) | ~(last > 0)
+        checks.append((invalid, 'invalid_order'))
+
+        # --- bracket sanity ---
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wrong_side = np.where(is_buy, ~((sl < last) & (last < tp)), ~((tp < last) & (last < sl)))
+            too_far = (np.abs(tp - last) / last > self.max_bracket_pct) | \
+                      (np.abs(sl - last) / last > self.max_bracket_pct)
+        bracket = wrong_side | too_far | ~(sl > 0)
+        checks.append((bracket, 'bracket'))
+
+        # --- duplicates (within the batch and against recent submissions) ---
+        # key = ticker code x side code (0 buy, 1 sell, 2 anything else)
+        keys = codes * 3 + np.where(is_buy, 0, np.where(is_sell, 1, 2))
+        duplicate = np.ones(n, dtype=bool)
+        duplicate[np.unique(keys, return_index=True)[1]] = False
+        if recent_codes.size:
+            recent_keys = recent_codes * 3 + np.where(recent_sides == 'buy', 0, np.where(recent_sides == 'sell', 1, 2))
+            duplicate |= np.isin(keys, recent_keys)
+        checks.append((duplicate, 'duplicate'))
+
+        # --- per-ticker limits and current positions ---
+        known = rows >= 0
+        max_value = np.full(n_tickers, float(self.max_position_value))
+        max_pct = np.full(n_tickers, float(self.max_ticker_pct))
+        sector = np.full(n_tickers, -1, dtype=np.int64)
+        if known.any():
+            max_value[known] = np.where(np.isnan(self._max_value[rows[known]]),
+                                        self.max_position_value, self._max_value[rows[known]])
+            max_pct[known] = np.where(np.isnan(self._max_pct[rows[known]]),
+                                      self.max_ticker_pct, self._max_pct[rows[known]])
+            sector[known] = self._sector[rows[known]]
+        current = np.zeros(n_tickers)
+        in_batch = (held_codes >= 0) & (held_codes < n_batch)
+        current[held_codes[in_batch]] = held_value[in_batch]
+
+        notional = np.where(is_buy, qty, -qty) * last
+
+        # --- daily loss limit: only orders that add risk are blocked ---
+        daily_pnl_pct = (equity - start_equity) / start_equity if start_equity > 0 else 0.0
+        if daily_pnl_pct <= -self.max_daily_loss_pct:
+            own_adds_risk = np.abs(current[codes] + notional) > np.abs(current[codes])
+            checks.append((own_adds_risk & ~invalid, 'daily_loss_limit'))
+
+        # orders rejected so far take no part in the exposure checks
+        rejected = np.zeros(n, dtype=bool)
+        for mask, _ in checks:
+            rejected |= mask
+        notional[rejected] = 0.0
+
+        # --- position size and concentration (post-trade) ---
+        # sector gross exposure before the batch, including held positions outside it
+        n_sectors = len(self._sector_names)
+        sector_base = np.zeros(n_sectors + 1)  # last slot collects tickers without a sector
+        np.add.at(sector_base, sector, np.abs(current))
+        if n_sectors and (~in_batch).any():
+            held_rows = all_rows[held_codes[~in_batch]]
+            held_sector = np.where(held_rows >= 0, self._sector[held_rows], -1)
+            np.add.at(sector_base, held_sector, np.abs(held_value[~in_batch]))
+        order_sector = sector[codes]
+        order_slot = np.where(order_sector >= 0, order_sector, n_sectors)
+
+        # Orders apply in batch order. An order breaches a limit if it grows the gross
+        # position and leaves the ticker or its sector over the limit. Only the first breach
+        # per sector (per ticker without a sector) is certain, as a dropped order changes
+        # the exposure seen by the orders after it, so those are dropped and the rest of
+        # the batch re-evaluated.
+        group = np.where(order_sector >= 0, order_sector, n_sectors + codes)
+        ticker_levels = _group_levels(codes) if n_tickers < n else []
+        sector_limit = self.max_sector_pct * equity
+        breach = {'max_position': np.zeros(n, dtype=bool),
+                  'ticker_concentration': np.zeros(n, dtype=bool),
+                  'sector_concentration': np.zeros(n, dtype=bool)}
+        dropped = np.zeros(n, dtype=bool)
+        while True:
+            live = np.where(dropped, 0.0, notional)
+            after = current[codes] + _running_sum(live, ticker_levels)
+            growth = np.abs(after) - np.abs(after - live)
+            adds_risk = growth > 0
+            # running sector sums are only needed where the added exposure can cross the limit
+            bound = sector_base + np.bincount(order_slot, weights=np.maximum(growth, 0.0), minlength=n_sectors + 1)
+            hot = (bound > sector_limit)[order_slot] & (order_sector >= 0)
+            over_sector = np.zeros(n, dtype=bool)
+            if hot.any():
+                sector_levels = _group_levels(np.where(hot, order_sector, n_sectors + np.arange(n)))
+                sector_after = sector_base[order_slot] + _running_sum(growth, sector_levels)
+                over_sector = hot & (sector_after > sector_limit)
+            masks = {'max_position': adds_risk & (np.abs(after) > max_value[codes]),
+                     'ticker_concentration': adds_risk & (np.abs(after) > max_pct[codes] * equity),
+                     'sector_concentration': adds_risk & over_sector}
+            breaching = np.flatnonzero(masks['max_position'] | masks['ticker_concentration'] |
+                                       masks['sector_concentration'])
+            if breaching.size == 0:
+                break
+            first = breaching[np.unique(group[breaching], return_index=True)[1]]
+            for reason, mask in masks.items():
+                breach[reason][first] = mask[first]
+            dropped[first] = True
+        checks.extend((mask, reason) for reason, mask in breach.items())
+        rejected |= dropped
+
+        # --- collect results ---
+        reasons = np.full(n, '', dtype=object)
+        for i in np.flatnonzero(rejected):
+            reasons[i] = ';'.join(reason for mask, reason in checks if mask[i])
+            self.logger.warning(f"Rejected {side[i]} {qty[i]:g} {symbols[i]} "
+                                f"(TP {tp[i]}, SL {sl[i]}, last {last[i]}): {reasons[i]}")
+        return ~rejected, reasons
+
+    def check_orders(self, orders: pd.DataFrame, equity: float, start_equity: float = None,
+                     positions: dict = None, now: float = None) -> pd.DataFrame:
+        """
+        Dataframe front end of check().
+        Args:
+            orders: dataframe with Symbol, Qty, Side ('buy'/'sell'), TakeProfit, StopLoss, LastPrice.
+            equity: current account equity.
+            start_equity: equity at the start of the trading day (defaults to equity).
+            positions: current position market value per symbol (dict or Series).
+            now: timestamp used for duplicate detection, defaults to time.time().
+        Returns:
+            The orders with an added Accepted bool column and a Reason column for rejections.
+        """
+        if positions is not None and not isinstance(positions, dict):
+            positions = positions.to_dict()
+        accepted, reasons = self.check(
+            orders['Symbol'].to_numpy(), orders['Side'].to_numpy(), orders['Qty'].to_numpy(),
+            orders['TakeProfit'].to_numpy(), orders['StopLoss'].to_numpy(), orders['LastPrice'].to_numpy(),
+            equity, start_equity=start_equity, positions=positions, now=now)
+        return orders.assign(Accepted=accepted, Reason=reasons)
+
+
+if __name__ == "__main__":
+    # sanity checks of the gate on malformed input
+    engine = RiskEngine(max_position_value=50_000)
+    accepted, reasons = engine.check(['A', 'B'], ['sell', None], [10, 10], [95, 95], [105, 105],
+                                     [100, 100], equity=200_000)
+    assert list(accepted) == [True, False] and reasons[1] == 'invalid_order', reasons
+    accepted, reasons = engine.check(['A', 'B'], [None, None], [10, 10], [105, 105], [95, 95],
+                                     [100, 100], equity=200_000)
+    assert not accepted.any() and all('invalid_order' in r for r in reasons), reasons
+    accepted, reasons = engine.check(['A', None, 'B'], ['buy', 'buy', 'buy'], [10, 300, 10],
+                                     [105, 105, 105], [95, 95, 95], [100, 100, 100], equity=200_000,
+                                     positions={'A': 1_000.0, 'C': 2_000.0})
+    assert list(accepted) == [True, False, True] and reasons[1] == 'invalid_order', reasons
+    print("[+] RiskEngine checks passed")
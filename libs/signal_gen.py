@@ -1,22 +1,26 @@
 import pandas as pd
 from libs.data_loader import get_stock_data
-from libs.bull_detector import detect_and_label_bull_runs
+from libs.bull_detector import detect_and_label_bull_runs, BullRunStream
+from libs.make_dataset import IndicatorStream, rolling_mean
 
 
 class SignalGenerator:
     def __init__(self, tickers: list[str], start="2020-01-01", end=None,
-                 trend_window=60, slope_threshold_ppd=0.001, min_bull_duration_days=7):
+                 trend_window=60, slope_threshold_ppd=0.001, min_bull_duration_days=7, interval="1d"):
         self.tickers = tickers
         self.start = start
         self.end = end
+        self.interval = interval
         self.data = None
         self.trend_window = trend_window
         self.slope_threshold_ppd = slope_threshold_ppd
         self.min_bull_duration_days = min_bull_duration_days
+        self._scorer = None      # predictor that already holds our trailing bars
+        self._last_scored = None  # Ticker -> last Date sent to it
 
     def load_data(self):
         """Fetch stock data and label bull runs."""
-        self.data = get_stock_data(self.tickers, start=self.start, end=self.end)
+        self.data = get_stock_data(self.tickers, start=self.start, end=self.end, interval=self.interval)
         self.data, _ = detect_and_label_bull_runs(
             self.data, self.tickers,
             trend_window=self.trend_window,
@@ -30,9 +34,13 @@ class SignalGenerator:
         df = self.data[self.data["Ticker"] == ticker].copy()
         df = df.sort_values("Date")
 
-        df["SMA_short"] = df["Close"].rolling(window=short_window).mean()
-        df["SMA_long"] = df["Close"].rolling(window=long_window).mean()
+        df["SMA_short"] = rolling_mean(df["Close"], short_window)
+        df["SMA_long"] = rolling_mean(df["Close"], long_window)
 
+        return self._crossover_signals(df)
+
+    @staticmethod
+    def _crossover_signals(df: pd.DataFrame) -> pd.DataFrame:
         df["signal"] = 0
         # Only generate signals if the stock is currently in a bull run
         df.loc[(df["SMA_short"] > df["SMA_long"]) & (df["InBullRun"]), "signal"] = 1  # Buy
@@ -40,8 +48,92 @@ class SignalGenerator:
 
         return df[["Date", "Ticker", "Close", "SMA_short", "SMA_long", "InBullRun", "signal"]]
 
+    def stream_signals(self, chunks, short_window=20, long_window=50):
+        """
+        Bull-run labels and SMA crossover signals for a stream of bar chunks
+        (e.g. data_loader.iter_stock_data / iter_csv_bars with minute bars).
+        Rolling state is carried across chunks, so memory stays bounded by the chunk
+        size and the signals equal moving_average_crossover on the full history.
+        Bars are yielded once their bull-run label is settled, which can lag the
+        input by up to min_bull_duration_days bars.
+        Returns:
+            Generator of signal dataframes, one per processed chunk.
+        """
+        stream = SignalStream(self.trend_window, self.slope_threshold_ppd, self.min_bull_duration_days,
+                              short_window=short_window, long_window=long_window)
+        for chunk in chunks:
+            signals = stream.update(chunk)
+            if not signals.empty:
+                yield signals
+        signals = stream.finish()
+        if not signals.empty:
+            yield signals
+
     def get_latest_signal(self, ticker: str) -> int:
         """Return the latest signal for a ticker."""
         df = self.moving_average_crossover(ticker)
         latest_signal = df["signal"].iloc[-1]
-        return int(latest_signal)
\ No newline at end of file
+        return int(latest_signal)
+
+    def get_trade_probabilities(self, predictor) -> pd.DataFrame:
+        """
+        Score every ticker's latest bar in one batched call.
+        Bars go through the predictor's incremental path: the first call sends the whole
+        history, later calls only the bars from the oldest per-ticker last bar onwards
+        (re-sent bars replace the earlier copy), so refresh self.data between calls and
+        the feature cost stays independent of the history length.
+        Args:
+            predictor: PredictionService, or PredictionClient of a running trade_predictor process.
+        Returns:
+            Dataframe with Date, Ticker and ProbTP.
+        """
+        if self.data is None:
+            self.load_data()
+        bars = self.data
+        if predictor is self._scorer and self._last_scored is not None:
+            bars = bars[bars['Date'] >= self._last_scored.min()]
+        probs = predictor.predict_universe(bars, incremental=True)
+
+        last = bars.groupby('Ticker')['Date'].max()
+        if predictor is self._scorer and self._last_scored is not None:
+            last = last.combine(self._last_scored, max, fill_value=pd.NaT)
+        self._scorer, self._last_scored = predictor, last
+        # a shared service also holds other generators' tickers
+        return probs[probs['Ticker'].isin(self.tickers)].reset_index(drop=True)
+
+
+class SignalStream:
+    """
+    Stateful bar-by-bar (or chunk-by-chunk) version of the SignalGenerator signal path:
+    bull-run labelling followed by the SMA crossover, with rolling state carried
+    between calls. label() and signals() are exposed separately so callers can time
+    the two steps.
+    """
+
+    def __init__(self, trend_window=60, slope_threshold_ppd=0.001, min_bull_duration_days=7,
+                 short_window=20, long_window=50):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.bull = BullRunStream(trend_window=trend_window,
+                                  slope_threshold_ppd=slope_threshold_ppd,
+                                  min_bull_duration_days=min_bull_duration_days)
+        self.smas = IndicatorStream(sma_windows=(short_window, long_window), rsi_period=None)
+
+    def label(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Bull-run labels for the bars that are settled after this chunk."""
+        return self.bull.update(chunk)
+
+    def signals(self, labeled: pd.DataFrame) -> pd.DataFrame:
+        """SMA crossover signals for labeled bars."""
+        if labeled.empty:
+            return labeled
+        df = self.smas.update(labeled)
+        df = df.rename(columns={f"SMA_{self.short_window}": "SMA_short", f"SMA_{self.long_window}": "SMA_long"})
+        return SignalGenerator._crossover_signals(df)
+
+    def update(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        return self.signals(self.label(chunk))
+
+    def finish(self) -> pd.DataFrame:
+        labeled, _ = self.bull.finish()
+        return self.signals(labeled)
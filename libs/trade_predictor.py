@@ -0,0 +1,359 @@
+import os
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+
+FEATURE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Slope', 'InBullRun',
+                   'SMA_20', 'SMA_50', 'RSI_14']
+LABEL_COLUMN = 'Label'
+CLASSES = np.array([0, 1])  # 0 = stop loss hit first, 1 = take profit hit first
+SERVICE_ADDRESS = ('localhost', 6001)
+
+load_dotenv('env/.env')
+
+
+def iter_labeled_chunks(path: str, max_holding: int, features: list[str] = None,
+                        chunksize: int = 100_000):
+    """
+    Streams a make_dataset CSV and yields only bars whose label is final.
+    A bar's label is final once `max_holding` later bars of the same ticker exist,
+    so the last `max_holding` bars of every ticker are held back. Rows near a chunk
+    boundary are carried into the next chunk until that can be decided.
+    Args:
+        path: dataset CSV written by make_dataset (sorted by Ticker, Date).
+        max_holding: holding horizon used to build the labels.
+        features: feature columns to keep. Defaults to FEATURE_COLUMNS.
+        chunksize: number of CSV rows read at a time.
+    Returns:
+        Generator of dataframes with Date, Ticker, features and Label.
+    """
+    features = features or FEATURE_COLUMNS
+    usecols = ['Date', 'Ticker'] + features + [LABEL_COLUMN]
+    carry = None
+    for chunk in pd.read_csv(path, usecols=usecols, parse_dates=['Date'], chunksize=chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        bars_after = chunk.groupby('Ticker', sort=False).cumcount(ascending=False)
+        last_ticker = chunk['Ticker'].iloc[-1]
+        pending = (chunk['Ticker'] == last_ticker) & (bars_after < max_holding)
+        carry = chunk[pending]
+        final = chunk[bars_after >= max_holding]
+        final = final[(final[LABEL_COLUMN] != -1) & final[features].notna().all(axis=1)]
+        if not final.empty:
+            yield final
+
+
+class TradePredictor:
+    """
+    Incrementally trainable classifier for the make_dataset TP/SL labels.
+    Wraps a StandardScaler and a logistic SGDClassifier, both updated with
+    partial_fit, so new bars can be folded in without a full retrain.
+    """
+
+    def __init__(self, features: list[str] = None, alpha: float = 1e-4, random_state: int = 42):
+        self.features = list(features or FEATURE_COLUMNS)
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.n_samples_seen = 0
+        self.watermarks = {}  # Ticker -> last Date already trained on
+
+    def _matrix(self, df: pd.DataFrame) -> np.ndarray:
+        missing = [c for c in self.features if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        return df[self.features].to_numpy(dtype=float)
+
+    def partial_fit(self, df: pd.DataFrame) -> "TradePredictor":
+        """Update the scaler and classifier with a batch of labeled bars."""
+        if df.empty:
+            return self
+        X = self._matrix(df)
+        y = df[LABEL_COLUMN].to_numpy(dtype=int)
+        self.scaler.partial_fit(X)
+        self.model.partial_fit(self.scaler.transform(X), y, classes=CLASSES)
+        self.n_samples_seen += len(df)
+
+        last_dates = df.groupby('Ticker')['Date'].max()
+        for ticker, date in last_dates.items():
+            if ticker not in self.watermarks or date > self.watermarks[ticker]:
+                self.watermarks[ticker] = date
+        return self
+
+    def predict_proba(self, df: pd.DataFrame) -> np.ndarray:
+        """Probability that the take profit is hit before the stop loss."""
+        X = self.scaler.transform(self._matrix(df))
+        return self.model.predict_proba(X)[:, 1]
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        X = self.scaler.transform(self._matrix(df))
+        return self.model.predict(X)
+
+    def unseen_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rows dated after the last bar trained on for their ticker."""
+        if not self.watermarks:
+            return df
+        watermark = df['Ticker'].map(self.watermarks)
+        return df[watermark.isna() | (df['Date'] > watermark)]
+
+
+def train_from_csv(path: str, max_holding: int, features: list[str] = None,
+                   chunksize: int = 100_000, epochs: int = 1) -> TradePredictor:
+    """
+    Trains a TradePredictor by streaming the dataset CSV in chunks.
+    Args:
+        path: dataset CSV written by make_dataset.
+        max_holding: holding horizon used to build the labels.
+        features: feature columns. Defaults to FEATURE_COLUMNS.
+        chunksize: number of CSV rows read at a time.
+        epochs: number of passes over the file.
+    Returns:
+        Trained TradePredictor.
+    """
+    predictor = TradePredictor(features)
+    for _ in range(epochs):
+        for chunk in iter_labeled_chunks(path, max_holding, predictor.features, chunksize):
+            predictor.partial_fit(chunk)
+    print(f"[+] Trained on {predictor.n_samples_seen} bars from {path}")
+    return predictor
+
+
+def build_latest_features(df: pd.DataFrame, sma_windows=(20, 50), rsi_period: int = 14) -> pd.DataFrame:
+    """
+    Builds one feature row per ticker from the latest bars of every ticker at once.
+    Only the trailing bars needed by the indicators are kept; they are laid out as a
+    (bars x tickers) matrix so SMA and RSI are single array reductions, with values
+    identical to the last row of the make_dataset features.
+    Args:
+        df: long price dataframe with Date, Ticker, OHLCV, Slope and InBullRun.
+        sma_windows: SMA lengths, producing SMA_<window> columns.
+        rsi_period: RSI length, producing RSI_<period> column.
+    Returns:
+        Dataframe with the latest Date and the features of every ticker.
+    """
+    lookback = max(max(sma_windows), rsi_period + 1)
+    df = df.sort_values('Date', kind='stable')
+    bars_after = df.groupby('Ticker', sort=False).cumcount(ascending=False).to_numpy()
+    tail = df[bars_after < lookback]
+    bars_after = bars_after[bars_after < lookback]
+
+    latest = tail[bars_after == 0].reset_index(drop=True)
+    codes = pd.Index(latest['Ticker']).get_indexer(tail['Ticker'])
+    close = np.full((lookback, len(latest)), np.nan)
+    close[lookback - 1 - bars_after, codes] = tail['Close'].to_numpy(dtype=float)
+
+    for window in sma_windows:
+        latest[f'SMA_{window}'] = close[-window:].mean(axis=0)
+
+    delta = np.diff(close[-(rsi_period + 1):], axis=0)
+    gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+    loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+    gain[np.isnan(delta).any(axis=0)] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        latest[f'RSI_{rsi_period}'] = 100 - (100 / (1 + gain / loss))
+    return latest
+
+
+class FeatureWindow:
+    """
+    Trailing bars of every ticker, just enough for build_latest_features. A live loop
+    adds only the new bars on each call, so feature building costs O(tickers x lookback)
+    instead of re-sorting the whole history.
+    """
+
+    def __init__(self, sma_windows=(20, 50), rsi_period: int = 14):
+        self.sma_windows = tuple(sma_windows)
+        self.rsi_period = rsi_period
+        self.lookback = max(max(self.sma_windows), rsi_period + 1)
+        self.bars = None
+
+    def update(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds bars (a full history on the first call, then new bars only) and returns
+        the latest feature row of every ticker. A re-sent bar replaces the earlier one.
+        """
+        window = bars if self.bars is None else pd.concat([self.bars, bars], ignore_index=True)
+        window = window.drop_duplicates(['Ticker', 'Date'], keep='last').sort_values('Date', kind='stable')
+        self.bars = window.groupby('Ticker', sort=False).tail(self.lookback).reset_index(drop=True)
+        return build_latest_features(self.bars, self.sma_windows, self.rsi_period)
+
+
+class PredictionService:
+    """
+    Keeps the latest TradePredictor in memory and scores the whole universe per call.
+    With incremental calls the trailing bars of every ticker are kept in a FeatureWindow,
+    so callers send only the bars since the previous call. Per-call latencies (feature
+    building and model predict) are kept for the last `history` calls and reported by
+    latency_stats().
+    """
+
+    def __init__(self, model_dir: str = "models", version: int = None, history: int = 1000):
+        from libs.model_updater import ModelRegistry
+
+        self.registry = ModelRegistry(model_dir)
+        self.version = None
+        self.predictor = None
+        self._lock = threading.Lock()
+        self.window = FeatureWindow()
+        self._window_lock = threading.Lock()
+        self._latencies = {'features': deque(maxlen=history),
+                           'predict': deque(maxlen=history),
+                           'total': deque(maxlen=history)}
+        self.load(version)
+
+    def load(self, version: int = None) -> int:
+        """Loads a model version (latest by default) into memory."""
+        metadata = self.registry.load_metadata(version)
+        predictor = self.registry.load(metadata['version'])
+        with self._lock:
+            self.predictor, self.version = predictor, metadata['version']
+        return self.version
+
+    def reload_if_updated(self) -> bool:
+        """Swaps in a newer model saved by model_updater, if there is one."""
+        latest = self.registry.latest_version()
+        if latest is not None and latest != self.version:
+            self.load(latest)
+            return True
+        return False
+
+    def predict_universe(self, df: pd.DataFrame, features_ready: bool = False,
+                         incremental: bool = False) -> pd.DataFrame:
+        """
+        Scores every ticker with one batched predict.
+        Args:
+            df: long price dataframe (or one row per ticker if features_ready).
+            features_ready: skip build_latest_features, df already holds the features.
+            incremental: df only holds the bars since the previous incremental call (the
+                full history on the first one); earlier bars come from the FeatureWindow.
+        Returns:
+            Dataframe with Date, Ticker and ProbTP (NaN where features are incomplete).
+        """
+        t0 = time.perf_counter()
+        if features_ready:
+            latest = df.reset_index(drop=True)
+        elif incremental:
+            with self._window_lock:
+                latest = self.window.update(df)
+        else:
+            latest = build_latest_features(df)
+        t1 = time.perf_counter()
+
+        predictor = self.predictor
+        X = latest.reindex(columns=predictor.features).to_numpy(dtype=float)
+        valid = ~np.isnan(X).any(axis=1)
+        prob = np.full(len(latest), np.nan)
+        if valid.any():
+            prob[valid] = predictor.model.predict_proba(predictor.scaler.transform(X[valid]))[:, 1]
+        t2 = time.perf_counter()
+
+        with self._lock:
+            self._latencies['features'].append((t1 - t0) * 1000)
+            self._latencies['predict'].append((t2 - t1) * 1000)
+            self._latencies['total'].append((t2 - t0) * 1000)
+        return pd.DataFrame({'Date': latest.get('Date'), 'Ticker': latest['Ticker'], 'ProbTP': prob})
+
+    def latency_stats(self) -> pd.DataFrame:
+        """Count, mean and p50/p95/p99 latency in milliseconds per stage."""
+        rows = []
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._latencies.items()}
+        for stage, values in samples.items():
+            if values.size == 0:
+                rows.append({'Stage': stage, 'Calls': 0})
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            rows.append({'Stage': stage, 'Calls': values.size, 'MeanMs': values.mean(),
+                         'P50Ms': p50, 'P95Ms': p95, 'P99Ms': p99, 'LastMs': values[-1]})
+        return pd.DataFrame(rows)
+
+
+def _handle_connection(service: PredictionService, conn):
+    with conn:
+        while True:
+            try:
+                command, payload = conn.recv()
+            except EOFError:
+                return
+            try:
+                if command == 'predict':
+                    conn.send(('ok', service.predict_universe(**payload)))
+                elif command == 'stats':
+                    conn.send(('ok', service.latency_stats()))
+                elif command == 'reload':
+                    service.reload_if_updated()
+                    conn.send(('ok', service.version))
+                else:
+                    conn.send(('error', f"Unknown command: {command}"))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+def _service_authkey(authkey: bytes = None) -> bytes:
+    """
+    Connection key shared by serve() and PredictionClient. Connections exchange pickles,
+    so the key is a secret read from PREDICTION_SERVICE_AUTHKEY in env/.env.
+    """
+    authkey = authkey or os.getenv('PREDICTION_SERVICE_AUTHKEY', '').encode()
+    if not authkey:
+        raise ValueError("Set PREDICTION_SERVICE_AUTHKEY in env/.env (e.g. a random 32-byte hex string).")
+    return authkey
+
+
+def serve(model_dir: str = "models", address=SERVICE_ADDRESS, authkey: bytes = None):
+    """
+    Runs a long-lived local prediction process with the model kept warm.
+    Each client connection is served on its own thread; query it with PredictionClient.
+    authkey defaults to PREDICTION_SERVICE_AUTHKEY from env/.env.
+    """
+    authkey = _service_authkey(authkey)
+    service = PredictionService(model_dir)
+    with Listener(address, authkey=authkey) as listener:
+        print(f"[+] Prediction service (model v{service.version}) listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError) as e:
+                print(f"[!] Refused connection: {type(e).__name__}: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(service, conn), daemon=True).start()
+
+
+class PredictionClient:
+    """Client for the process started by serve(); same predict_universe API as PredictionService."""
+
+    def __init__(self, address=SERVICE_ADDRESS, authkey: bytes = None):
+        self.conn = Client(address, authkey=_service_authkey(authkey))
+
+    def _call(self, command: str, payload=None):
+        self.conn.send((command, payload))
+        status, result = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+    def predict_universe(self, df: pd.DataFrame, features_ready: bool = False,
+                         incremental: bool = False) -> pd.DataFrame:
+        return self._call('predict', {'df': df, 'features_ready': features_ready, 'incremental': incremental})
+
+    def latency_stats(self) -> pd.DataFrame:
+        return self._call('stats')
+
+    def reload_if_updated(self) -> int:
+        return self._call('reload')
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    serve()
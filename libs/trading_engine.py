@@ -1,13 +1,19 @@
 import alpaca_trade_api as tradeapi
+import pandas as pd
 from dotenv import load_dotenv
 
-load_dotenc('env/.env')
+from libs.safety_checks import RiskEngine
+
+load_dotenv('env/.env')
 
 class TradingEngine:
-    def __init__(self, api_key: str, secret_key: str, paper: bool = True):
+    def __init__(self, api_key: str, secret_key: str, paper: bool = True, risk_engine: RiskEngine = None,
+                 api=None):
         # self.base_url = "https://paper-api.alpaca.markets" if paper else "https://api.alpaca.markets"
-        self.api = tradeapi.REST(api_key, secret_key,
-                                 'https://paper-api.alpaca.markets/v2', api_version="v2")
+        # api: optional client with the alpaca REST interface (e.g. replay.FakeAlpacaREST for offline runs)
+        self.api = api or tradeapi.REST(api_key, secret_key,
+                                        'https://paper-api.alpaca.markets/v2', api_version="v2")
+        self.risk_engine = risk_engine
 
     def get_account_info(self):
         """Return account cash, equity, etc."""
@@ -17,11 +23,58 @@ class TradingEngine:
         """List all open positions."""
         return self.api.list_positions()
 
-    def place_order(self, symbol: str, qty: float, side: str, take_profit: float, stop_loss: float):
+    def _risk_check(self, orders: pd.DataFrame):
+        """Runs RiskEngine.check() on the order columns with the live account state."""
+        account = self.api.get_account()
+        positions = {p.symbol: float(p.market_value) for p in self.api.list_positions()}
+        return self.risk_engine.check(
+            orders['Symbol'].to_numpy(), orders['Side'].to_numpy(), orders['Qty'].to_numpy(),
+            orders['TakeProfit'].to_numpy(), orders['StopLoss'].to_numpy(), orders['LastPrice'].to_numpy(),
+            equity=float(account.equity), start_equity=float(account.last_equity), positions=positions)
+
+    def check_orders(self, orders: pd.DataFrame) -> pd.DataFrame:
+        """
+        Runs the risk engine over a batch of orders using the live account state.
+        Orders need Symbol, Qty, Side, TakeProfit, StopLoss and LastPrice columns.
+        Returns the orders with Accepted and Reason columns.
+        """
+        accepted, reasons = self._risk_check(orders)
+        return orders.assign(Accepted=accepted, Reason=reasons)
+
+    def place_orders(self, orders: pd.DataFrame) -> list:
+        """
+        Risk-checks a batch of bracket orders and submits only the accepted ones.
+        Without a risk engine every order is submitted.
+        """
+        if self.risk_engine is not None:
+            accepted, _ = self._risk_check(orders)
+            orders = orders[accepted]
+        symbols, sides = orders['Symbol'].to_numpy(), orders['Side'].to_numpy()
+        submitted = [self._submit_bracket(symbol, qty, side, take_profit, stop_loss)
+                     for symbol, qty, side, take_profit, stop_loss
+                     in zip(symbols, orders['Qty'], sides, orders['TakeProfit'], orders['StopLoss'])]
+        if self.risk_engine is not None:
+            self.risk_engine.record_submitted(symbols, sides)
+        return submitted
+
+    def place_order(self, symbol: str, qty: float, side: str, take_profit: float, stop_loss: float,
+                    last_price: float = None):
         """
         Places a bracket order: market entry + take profit + stop loss.
-        Example: engine.place_order("AAPL", 1, "buy", 190, 170)
+        With a risk engine the order is checked first (last_price is then required)
+        and None is returned if it is rejected.
+        Example: engine.place_order("AAPL", 1, "buy", 190, 170, last_price=180)
         """
+        if self.risk_engine is None:
+            return self._submit_bracket(symbol, qty, side, take_profit, stop_loss)
+        if last_price is None:
+            raise ValueError("last_price is required when a risk engine is configured.")
+        submitted = self.place_orders(pd.DataFrame([{
+            'Symbol': symbol, 'Qty': qty, 'Side': side, 'TakeProfit': take_profit,
+            'StopLoss': stop_loss, 'LastPrice': last_price}]))
+        return submitted[0] if submitted else None
+
+    def _submit_bracket(self, symbol: str, qty: float, side: str, take_profit: float, stop_loss: float):
         order = self.api.submit_order(
             symbol=symbol,
             qty=qty,
@@ -34,6 +87,10 @@ class TradingEngine:
         )
         return order
 
+    def close_positions(self, symbols) -> list:
+        """Liquidate the positions of the given symbols (exits are not risk-checked)."""
+        return [self.api.close_position(symbol) for symbol in symbols]
+
     def cancel_all_orders(self):
         """Cancel all active orders."""
         self.api.cancel_all_orders()
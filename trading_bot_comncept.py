@@ -15,9 +15,15 @@ from libs.bull_detector import summarize_bull_durations
 from libs.bull_detector import summarize_last_bull_runs
 from libs.stock_selector import calculate_ev_on_bull_runs
 from libs.logging_utils import get_logger, Logger
+from libs.pipeline import Pipeline, hash_files
+from libs import bull_detector, data_loader, stock_selector
 
 load_dotenv('env/.env')
-
+LOG_LEVEL = os.getenv('LOG_LEVEL')
+LOG_MSG_FORMAT = os.getenv('LOG_MSG_FORMAT')
+LOG_DATE_FORMAT = os.getenv('LOG_DATE_FORMAT')
+LOGS_PATH = os.getenv('LOGS_PATH')
+LOG_FILENAME = os.getenv('LOG_FILENAME')
 
 time_prefix = datetime.now().strftime('%Y-%m-%d')
 os.makedirs(LOGS_PATH, exist_ok=True)
@@ -25,40 +31,23 @@ LOG_FILENAME = os.path.join(LOGS_PATH, time_prefix + '_' + LOG_FILENAME)
 logger = get_logger(LOG_LEVEL, LOG_MSG_FORMAT, LOG_DATE_FORMAT, LOG_FILENAME)
 
 
+# -----------------------------
+# Pipeline stages: inputs arrive as keyword arguments named after upstream stages
+# -----------------------------
+def load_prices(tickers, start, as_of):
+    # as_of only keys the cache, so prices are downloaded again on a new day
+    return get_stock_data(tickers, start=start)
 
 
+def load_fundamentals_stage(json_folder, columns_needed, files_hash):
+    return load_fundamentals(json_folder, columns_needed)
 
 
-if __name__ == "__main__":
-    # Universe
-    upstream_oil_gas_tickers = ["XOM", "CVX", "BP", "TTE", "ENIC", "PBR"]
-    beverage_tickers = ["KO", "PEP", "MNST", "KDP"]
-    green_energy_tickers = ["TSLA", "NEE", "ENPH", "SEDG", "BE"]
-    existing_tickers = ["AAPL", "MSFT", "NVDA", "JPM", "GS", "BAC", "JNJ", "PFE",
-                        "DAL", "GLD", "TLT", "XLP", "XLE", "SPY"]
-    tickers = existing_tickers + upstream_oil_gas_tickers + beverage_tickers + green_energy_tickers
-
-    # Params
-    stop_loss_pct = 0.02
-    take_profits = [0.04, 0.08, 0.10]
-    lookahead_days = 5
-    trend_window = 60
-    slope_threshold_ppd = 0.001       # ~0.05% per day slope on log-price
-    min_bull_duration_days = 7
-    cost_per_trade = 0.001
-    json_folder = r"C:\Users\HP\PycharmProjects\Trading_Bot\fundamentals_jsons"
-    columns_needed = ['Ticker', 'Date', 'netIncome', 'operatingCashFlow', 'freeCashFlow', 'capitalExpenditure']
-
-    # 1) Prices
-
-    df_clean = get_stock_data(tickers , start="2020-01-01")
-
-    # 2) Fundamentals (optional downstream usage)
-    fundamentals_df = load_fundamentals(json_folder, columns_needed)
-    latest_prices = df_clean.groupby('Ticker').last().reset_index()
+def align_universe(prices, fundamentals):
+    latest_prices = prices.groupby('Ticker').last().reset_index()
     numeric_df = pd.merge(
         latest_prices,
-        fundamentals_df.groupby('Ticker').last().reset_index(),
+        fundamentals.groupby('Ticker').last().reset_index(),
         on='Ticker', how='inner'
     )
     # Align tickers to those with fundamentals (if you want to restrict universe)
@@ -68,47 +57,109 @@ if __name__ == "__main__":
     numeric_features = numeric_df.select_dtypes(include=['float64', 'int64'])
     if not numeric_features.empty:
         _ = StandardScaler().fit_transform(numeric_features)
+    return tickers
 
-    # 3) Detect & label bull runs
-    df_clean, runs_df = detect_and_label_bull_runs(
-        df_clean, tickers,
+
+def label_bull_runs(prices, universe, trend_window, slope_threshold_ppd, min_bull_duration_days):
+    return detect_and_label_bull_runs(
+        prices, universe,
         trend_window=trend_window,
         slope_threshold_ppd=slope_threshold_ppd,
         min_bull_duration_days=min_bull_duration_days,
         use_log=True
     )
 
-    # 4) Summaries
+
+def summarize(bull_runs):
+    df_clean, runs_df = bull_runs
     bull_stats = summarize_bull_durations(runs_df)  # Avg/Median per ticker
     last_bull_df = summarize_last_bull_runs(df_clean, runs_df)
+    return bull_stats, last_bull_df
 
-    print("\n=== Last Qualified Bull Run per Ticker ===")
-    print(last_bull_df)
 
-    # 5) EV during qualified bull runs
-    ev_df = calculate_ev_on_bull_runs(
-        df_clean, tickers, bull_stats, take_profits,
+def expected_values(bull_runs, universe, summaries, take_profits, lookahead_days, stop_loss_pct, cost_per_trade):
+    df_clean, _ = bull_runs
+    bull_stats, _ = summaries
+    return calculate_ev_on_bull_runs(
+        df_clean, universe, bull_stats, take_profits,
         lookahead_days=lookahead_days,
         stop_loss_pct=stop_loss_pct,
         cost_per_trade=cost_per_trade
     )
+
+
+def rank(expected_values, summaries, recency_threshold):
+    _, last_bull_df = summaries
     merged_df = pd.merge(
-        ev_df,
+        expected_values,
         last_bull_df[['Ticker', 'DaysSinceLastBull']],
         on='Ticker',
         how='left'
     )
 
-    # Filter by recency: only stocks whose last bull ended within 60 days
-    recency_threshold = 60
+    # Filter by recency: only stocks whose last bull ended within recency_threshold days
     filtered_df = merged_df[merged_df['DaysSinceLastBull'] <= recency_threshold]
 
     # Sort by EV_with_costs descending
     filtered_df = filtered_df.sort_values('EV_with_costs', ascending=False).reset_index(drop=True)
 
-    best_tp_df = filtered_df.loc[filtered_df.groupby('Ticker')['EV_with_costs'].idxmax()].reset_index(drop=True)
+    return filtered_df.loc[filtered_df.groupby('Ticker')['EV_with_costs'].idxmax()].reset_index(drop=True)
+
+
+def build_pipeline(tickers, params, logger: Logger) -> Pipeline:
+    """
+    Declares the screening stages. Each stage output is cached on disk under a hash of
+    its parameters and inputs, so changing e.g. take_profits only reruns EV and ranking.
+    The libs modules a stage calls are listed as code_deps, so editing them reruns it too.
+    """
+    pipeline = Pipeline(cache_dir=".pipeline_cache", max_bytes=1024 ** 3, logger=logger)
+    pipeline.add("prices", load_prices, code_deps=[data_loader],
+                 params={'tickers': tickers, 'start': "2020-01-01", 'as_of': params['as_of']})
+    pipeline.add("fundamentals", load_fundamentals_stage, code_deps=[data_loader],
+                 params={'json_folder': params['json_folder'], 'columns_needed': params['columns_needed'],
+                         'files_hash': hash_files(os.path.join(params['json_folder'], "*.json"))})
+    pipeline.add("universe", align_universe, inputs=["prices", "fundamentals"])
+    pipeline.add("bull_runs", label_bull_runs, inputs=["prices", "universe"], code_deps=[bull_detector],
+                 params={k: params[k] for k in ('trend_window', 'slope_threshold_ppd', 'min_bull_duration_days')})
+    pipeline.add("summaries", summarize, inputs=["bull_runs"], code_deps=[bull_detector])
+    pipeline.add("expected_values", expected_values, inputs=["bull_runs", "universe", "summaries"],
+                 code_deps=[stock_selector],
+                 params={k: params[k] for k in ('take_profits', 'lookahead_days', 'stop_loss_pct', 'cost_per_trade')})
+    pipeline.add("ranking", rank, inputs=["expected_values", "summaries"],
+                 params={'recency_threshold': params['recency_threshold']})
+    return pipeline
 
-    print("\n=== Best TP per Ticker ===")
-    print(best_tp_df[['Ticker', 'TakeProfit', 'EV_with_costs', 'DaysSinceLastBull', 'MedianBullDuration']])
 
+if __name__ == "__main__":
+    # Universe
+    upstream_oil_gas_tickers = ["XOM", "CVX", "BP", "TTE", "ENIC", "PBR"]
+    beverage_tickers = ["KO", "PEP", "MNST", "KDP"]
+    green_energy_tickers = ["TSLA", "NEE", "ENPH", "SEDG", "BE"]
+    existing_tickers = ["AAPL", "MSFT", "NVDA", "JPM", "GS", "BAC", "JNJ", "PFE",
+                        "DAL", "GLD", "TLT", "XLP", "XLE", "SPY"]
+    tickers = existing_tickers + upstream_oil_gas_tickers + beverage_tickers + green_energy_tickers
+
+    # Params
+    params = {
+        'as_of': datetime.now().strftime('%Y-%m-%d'),  # new prices (and a new cache key) every day
+        'stop_loss_pct': 0.02,
+        'take_profits': [0.04, 0.08, 0.10],
+        'lookahead_days': 5,
+        'trend_window': 60,
+        'slope_threshold_ppd': 0.001,       # ~0.05% per day slope on log-price
+        'min_bull_duration_days': 7,
+        'cost_per_trade': 0.001,
+        'recency_threshold': 60,            # only stocks whose last bull ended within 60 days
+        'json_folder': r"C:\Users\HP\PycharmProjects\Trading_Bot\fundamentals_jsons",
+        'columns_needed': ['Ticker', 'Date', 'netIncome', 'operatingCashFlow', 'freeCashFlow', 'capitalExpenditure'],
+    }
+
+    results = build_pipeline(tickers, params, logger).run(["summaries", "ranking"])
+    _, last_bull_df = results["summaries"]
+    best_tp_df = results["ranking"]
+
+    print("\n=== Last Qualified Bull Run per Ticker ===")
+    print(last_bull_df)
 
+    print("\n=== Best TP per Ticker ===")
+    print(best_tp_df[['Ticker', 'TakeProfit', 'EV_with_costs', 'DaysSinceLastBull', 'MedianBullDuration']])